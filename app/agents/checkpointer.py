@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+
+class BoundedInMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer that keeps at most `max_threads` conversation threads.
+    
+    Threads are tracked in least-recently-used order; once the limit is exceeded
+    the coldest thread and all of its checkpoints are deleted.
+    """
+
+    def __init__(self, max_threads: int = 1024) -> None:
+        super().__init__()
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, None]" = OrderedDict()
+        self._threads_lock = threading.Lock()
+
+    def _touch(self, config: RunnableConfig) -> None:
+        """Mark a thread as recently used and evict the coldest threads over the limit."""
+        thread_id = config["configurable"]["thread_id"]
+        evicted = []
+        with self._threads_lock:
+            self._threads[thread_id] = None
+            self._threads.move_to_end(thread_id)
+            while len(self._threads) > self.max_threads:
+                evicted.append(self._threads.popitem(last=False)[0])
+
+        for evicted_thread_id in evicted:
+            super().delete_thread(evicted_thread_id)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoint_tuple = super().get_tuple(config)
+        if checkpoint_tuple is not None:
+            self._touch(config)
+        return checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._touch(config)
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._threads_lock:
+            self._threads.pop(thread_id, None)
+        super().delete_thread(thread_id)
@@ -1,22 +1,20 @@
 from langchain.agents import create_agent
-from langchain_openai import ChatOpenAI
 
 from app.agents.prompts.requirements_agent import requirment_agent_system_prompts
 from app.agents.response_models.requirements_agent import RequirementsResponseModel
-from app.agents.tools.colour_model import colour_predictor
-from app.core.config import settings
+from app.agents.tools.colour_model import colour_predictor, colour_predictor_batch
+from app.core.llm import precompile_tool_schemas, requirements_llm
 from langchain.agents.structured_output import ToolStrategy
 
 
+# Generate the tool schemas at import instead of on the first agent turn
+precompile_tool_schemas([colour_predictor, colour_predictor_batch])
 
-llm = ChatOpenAI(
-    api_key=settings.OPENAI_API_KEY,
-    model=settings.OPENAI_MODEL_NAME,
-)
 
 requirements_agent = create_agent(
-    model=llm,
-    tools=[colour_predictor],
+    model=requirements_llm,
+    tools=[colour_predictor, colour_predictor_batch],
+    # Static and always first, so OpenAI can reuse the cached prompt prefix across turns
     system_prompt=requirment_agent_system_prompts,
     response_format=ToolStrategy(RequirementsResponseModel),
 )
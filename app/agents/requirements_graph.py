@@ -1,35 +1,170 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional
+import logging
+import sys
+from typing import List, Optional
 
+from cachetools import TTLCache
 from langchain.messages import HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.utils.json import parse_partial_json
 from langgraph.graph import StateGraph, MessagesState, START, END
-from langgraph.types import interrupt, Command
-from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.types import interrupt, Command, StreamWriter
 
+from app.agents.checkpointer import BoundedInMemorySaver
 from app.agents.requirements_agent import requirements_agent
+from app.agents.response_models.requirements_agent import RequirementsResponseModel
 from app.agents.tools.colour_model import predict_from_requirements
+from app.core.config import settings
+from app.core.sessions import SESSION_TTL_SECONDS
+
+try:
+    import redis.asyncio as redis
+    from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+except ImportError:  # optional "redis" extra; checkpoints stay in process memory
+    redis = None
+    AsyncRedisSaver = None
+
+logger = logging.getLogger(__name__)
+
+# Number of parameters the agent has to gather before a prediction can be made
+_REQUIRED_FIELD_COUNT = 12
+
+# Name of the tool call the agent answers through (ToolStrategy names it after the schema)
+_RESPONSE_TOOL_NAME = RequirementsResponseModel.__name__
+
+# Structured agent responses keyed by the conversation they answered (entries expire after 1h)
+_RESPONSE_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=3600)
 
 
 class RequirementsGraphState(MessagesState):
     requirements_complete: bool = False
     interruption_message: str = ""
+    missing_fields: Optional[List[str]] = None
     requirements: Optional[dict] = None
     prediction_result: Optional[dict] = None
 
 
-def requirements_agent_node(state: RequirementsGraphState) -> RequirementsGraphState:
-    response = requirements_agent.invoke({"messages": state["messages"]})
+def _log_prompt_cache_usage(messages: list) -> None:
+    """Log how many prompt tokens OpenAI served from its prefix cache for one agent turn."""
+    input_tokens = 0
+    cached_tokens = 0
+    for message in messages:
+        usage = getattr(message, "usage_metadata", None) or {}
+        input_tokens += usage.get("input_tokens", 0)
+        cached_tokens += usage.get("input_token_details", {}).get("cache_read", 0)
+
+    logger.info("requirements_agent prompt tokens: %d input, %d cached", input_tokens, cached_tokens)
+
+
+def _log_saved_round_trips(previous_missing: List[str], missing: List[str]) -> None:
+    """Log when one user reply filled several fields, each of which used to cost an extra turn."""
+    filled = _REQUIRED_FIELD_COUNT - len(missing)
+    saved = len(previous_missing) - len(missing) - 1
+    if saved > 0 and filled * 2 >= _REQUIRED_FIELD_COUNT:
+        logger.info(
+            "Filled %d fields in one turn (%d/%d complete), saved %d round-trips",
+            saved + 1,
+            filled,
+            _REQUIRED_FIELD_COUNT,
+            saved,
+        )
+
+
+def _partial_question(args: str) -> str:
+    """Pull missing_info.question out of a structured-response tool call that is still streaming in."""
+    parsed = parse_partial_json(args) if args else None
+    if not isinstance(parsed, dict):
+        return ""
+    missing_info = (parsed.get("requirements") or {}).get("missing_info") or {}
+    question = missing_info.get("question") if isinstance(missing_info, dict) else None
+    return question if isinstance(question, str) else ""
+
+
+async def _stream_agent_response(agent_input: dict, config: RunnableConfig, writer: StreamWriter) -> dict:
+    """
+    Run the agent, forwarding its question to the graph's "custom" stream as it arrives.
+    
+    The agent answers through the structured-response tool, so its question comes in
+    as tool-call argument chunks; each new piece of it is sent as a token.
+    Returns the agent's final output, taken from the end event of the root run.
+    """
+    root_run_id = None
+    response = None
+    # Per (model run, tool call index): tool name, argument JSON so far and question already sent
+    tool_calls = {}
+
+    async for event in requirements_agent.astream_events(agent_input, config, version="v2"):
+        if root_run_id is None:
+            root_run_id = event["run_id"]
+
+        if event["event"] == "on_chat_model_stream":
+            for tool_chunk in event["data"]["chunk"].tool_call_chunks:
+                call = tool_calls.setdefault((event["run_id"], tool_chunk.get("index")), {"name": "", "args": "", "sent": ""})
+                call["name"] = call["name"] or tool_chunk.get("name") or ""
+                call["args"] += tool_chunk.get("args") or ""
+                if call["name"] != _RESPONSE_TOOL_NAME:
+                    continue
+
+                question = _partial_question(call["args"])
+                if len(question) > len(call["sent"]) and question.startswith(call["sent"]):
+                    writer({"token": question[len(call["sent"]):]})
+                    call["sent"] = question
+        elif event["event"] == "on_chain_end" and event["run_id"] == root_run_id:
+            response = event["data"]["output"]
+
+    if response is None:
+        raise RuntimeError("requirements_agent stream ended without the root run's output")
+    return response
+
+
+def _response_cache_key(state: RequirementsGraphState) -> str:
+    """Hash the parts of the state the agent's answer depends on into a stable cache key."""
+    canonical_state = {
+        "messages": [(message.type, message.content) for message in state["messages"]],
+        "missing_fields": sorted(state.get("missing_fields") or []),
+    }
+    return hashlib.sha1(json.dumps(canonical_state, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def requirements_agent_node(
+    state: RequirementsGraphState, config: RunnableConfig, writer: StreamWriter
+) -> RequirementsGraphState:
+    # An identical conversation gets the same answer without another LLM call
+    cache_key = _response_cache_key(state)
+    response = _RESPONSE_CACHE.get(cache_key)
+
+    if response is None:
+        # Only conversation messages go in; the static system prompt stays the first message
+        agent_input = {"messages": state["messages"]}
+
+        # Stream tokens only when the caller asked for them; otherwise take the blocking path
+        if config.get("configurable", {}).get("stream_tokens"):
+            agent_output = await _stream_agent_response(agent_input, config, writer)
+        else:
+            agent_output = await requirements_agent.ainvoke(agent_input, config)
+        _log_prompt_cache_usage(agent_output["messages"][len(state["messages"]):])
+
+        response = agent_output["structured_response"]
+        _RESPONSE_CACHE[cache_key] = response
+    else:
+        logger.info("requirements_agent response served from cache")
 
-    response = response["structured_response"]
     requirements_response = response.requirements
+    missing_info = requirements_response.missing_info
+    _log_saved_round_trips(state.get("missing_fields") or [], missing_info.missing_fields)
 
-    if requirements_response.missing_info.question != "":
+    if missing_info.question != "" or missing_info.missing_fields:
+        # Ask for every missing field in a single question
+        question = missing_info.render_question()
         return {
             "messages": [
-                AIMessage(content=requirements_response.missing_info.question)
+                AIMessage(content=question)
             ],
-            "interruption_message": requirements_response.missing_info.question,
+            "interruption_message": question,
             "requirements_complete": False,
+            "missing_fields": list(missing_info.missing_fields),
             "requirements": None,
             "prediction_result": None,
         }
@@ -39,6 +174,7 @@ def requirements_agent_node(state: RequirementsGraphState) -> RequirementsGraphS
         "messages": [],
         "requirements_complete": True,
         "interruption_message": "",
+        "missing_fields": [],
         "requirements": requirements_response.model_dump(),
         "prediction_result": None,
     }
@@ -48,6 +184,7 @@ def should_ask_user_for_info(state: RequirementsGraphState) -> bool:
     return not state["requirements_complete"]
 
 
+# Kept sync: it does no I/O, and interrupt() inside an async node needs Python 3.11+
 def ask_user_for_info(state: RequirementsGraphState) -> RequirementsGraphState:
     user_response = interrupt(state["interruption_message"])
 
@@ -60,7 +197,7 @@ def ask_user_for_info(state: RequirementsGraphState) -> RequirementsGraphState:
     }
 
 
-def make_prediction_node(state: RequirementsGraphState) -> RequirementsGraphState:
+async def make_prediction_node(state: RequirementsGraphState) -> RequirementsGraphState:
     """
     Node that makes RGB predictions using the gathered requirements.
     This node is called after all requirements are collected.
@@ -75,8 +212,9 @@ def make_prediction_node(state: RequirementsGraphState) -> RequirementsGraphStat
             },
         }
     
-    print("\n--- Making RGB prediction from gathered requirements ---")
-    prediction_result = predict_from_requirements(requirements)
+    logger.debug("Making RGB prediction from gathered requirements")
+    # sklearn inference is CPU-bound; run it off the event loop so other conversations keep going
+    prediction_result = await asyncio.to_thread(predict_from_requirements, requirements)
     
     return {
         "prediction_result": prediction_result,
@@ -96,12 +234,41 @@ graph.add_conditional_edges(
 graph.add_edge("ask_user_for_info", "requirements_agent")
 graph.add_edge("make_prediction", END)
 
-checkpointer = InMemorySaver()
+# Checkpoints live in Redis when REDIS_URL is set, so every worker can resume any
+# conversation; they expire with their session and each read extends them
+if settings.REDIS_URL:
+    if AsyncRedisSaver is None:
+        raise RuntimeError("REDIS_URL is set but 'langgraph-checkpoint-redis' is not installed.")
+    _checkpoint_redis = redis.Redis.from_url(settings.REDIS_URL)
+    checkpointer = AsyncRedisSaver(
+        redis_client=_checkpoint_redis,
+        ttl={"default_ttl": SESSION_TTL_SECONDS // 60, "refresh_on_read": True},
+    )
+else:
+    _checkpoint_redis = None
+    checkpointer = BoundedInMemorySaver(max_threads=settings.CHECKPOINT_MAX_THREADS)
+
 requirements_graph = graph.compile(checkpointer=checkpointer)
 
 
-if __name__ == "__main__":
-    initial_state = RequirementsGraphState(
+async def open_checkpointer() -> None:
+    """Create the Redis checkpoint indices if needed; call once on process startup."""
+    if _checkpoint_redis is not None:
+        await checkpointer.asetup()
+
+
+async def close_checkpointer() -> None:
+    """Close the Redis checkpoint connections; call once on process shutdown."""
+    if _checkpoint_redis is not None:
+        await _checkpoint_redis.aclose()
+
+
+async def _run_cli() -> None:
+    """Run the graph in the terminal, printing agent tokens as they stream in."""
+    config = {"configurable": {"thread_id": "thread-1", "stream_tokens": True}}
+    await open_checkpointer()
+
+    graph_input = RequirementsGraphState(
         messages=[
             HumanMessage(
                 content=""
@@ -109,21 +276,28 @@ if __name__ == "__main__":
         ]
     )
 
-    config = {"configurable": {"thread_id": "thread-1"}}
+    while True:
+        interrupts = None
+        async for mode, chunk in requirements_graph.astream(
+            graph_input, config, stream_mode=["custom", "updates"]
+        ):
+            if mode == "custom":
+                sys.stdout.write(chunk["token"])
+                sys.stdout.flush()
+            elif "__interrupt__" in chunk:
+                interrupts = chunk["__interrupt__"]
 
-    result = requirements_graph.invoke(initial_state, config)
+        if not interrupts:
+            break
 
-    while True:
-        if "__interrupt__" in result:
-            print(result["__interrupt__"])
+        print(interrupts)
 
-            user_input = input("")
+        user_input = input("")
 
-            current_state = Command(resume=user_input)
+        graph_input = Command(resume=user_input)
 
-            result = requirements_graph.invoke(current_state, config)
-        else:
-            break
+    result = (await requirements_graph.aget_state(config)).values
+    await close_checkpointer()
 
     print("\n=== Gathered Requirements ===")
     print(json.dumps(result["requirements"], indent=2))
@@ -136,4 +310,8 @@ if __name__ == "__main__":
             print(f"Predicted RGB: R={rgb['R']}, G={rgb['G']}, B={rgb['B']}")
             print(f"Hex Color: {pred['hex_color']}")
         else:
-            print(f"Prediction failed: {pred.get('error', 'Unknown error')}")
\ No newline at end of file
+            print(f"Prediction failed: {pred.get('error', 'Unknown error')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_cli())
@@ -1,51 +1,65 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
 
-class RgbDetails(BaseModel):
+class _StructuredResponse(BaseModel):
+    """Base for structured agent output: immutable, and unknown fields are rejected."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+
+class RgbDetails(_StructuredResponse):
     dye_red_owf: float = Field(..., description="red scale as a percentage between 0% and 5%")
     dye_green_owf: float = Field(..., description="green scale as a percentage between 0% and 5%")
     dye_blue_owf: float = Field(..., description="blue scale as a percentage between 0% and 5%")
 
 
-class ChemicalDetails(BaseModel):
+class ChemicalDetails(_StructuredResponse):
     salt_gL: float = Field(..., description="salt concentration between 40–80 g/L")
     sodaAsh_gL: float = Field(..., description="soda ash concentration between 10–20 g/L")
 
 
-class TemperatureDetails(BaseModel):
+class TemperatureDetails(_StructuredResponse):
     temp_C: int = Field(..., description="Dyeing temperature 60–80°C")
     soap_temp_C: int = Field(..., description="Soaping temperature 70–95°C")
 
 
-class TimeDetails(BaseModel):
+class TimeDetails(_StructuredResponse):
     time_min: int = Field(..., description="Dyeing time 30–90 min")
     soap_time_min: int = Field(..., description="Soaping time 10–30 min")
 
 
-class LiquorRatio(BaseModel):
-    liquor_ratio: float = Field(..., description="Water ratio for 1kg of fabric (10–20)")
+class LiquorRatio(_StructuredResponse):
+    liquor_ratio: float = Field(..., description="Water ratio for 1kg of fabric (8–15)")
 
 
-class PhDetails(BaseModel):
+class PhDetails(_StructuredResponse):
     pH: float = Field(..., description="pH of water between 10 and 11.5")
 
 
-class WaterHardness(BaseModel):
+class WaterHardness(_StructuredResponse):
     water_hardness_ppm : int = Field(..., description="Water hardness 50–300 ppm")
 
 
-class UserConfirmations(BaseModel):
+class UserConfirmations(_StructuredResponse):
     accept_outbound_top_option: bool = Field(...)
     notes: Optional[str] = Field(None)
 
 
-class MissingInfo(BaseModel):
-    missing_fields: List[str] = Field(...)
-    question: str = Field(...)
+class MissingInfo(_StructuredResponse):
+    missing_fields: List[str] = Field(..., description="Every field that is still missing")
+    question: str = Field(..., description="Short lead-in asking the user for all missing fields at once")
+
+    def render_question(self) -> str:
+        """Render a single question that lists every missing field as a bullet."""
+        if not self.missing_fields:
+            return self.question
+
+        bullets = "\n".join(f"- {field}" for field in self.missing_fields)
+        return f"{self.question}\n{bullets}" if self.question else bullets
 
 
-class CompleteRequirements(BaseModel):
+class CompleteRequirements(_StructuredResponse):
     rgb_details: RgbDetails
     chemical_details: ChemicalDetails
     temperature_details: TemperatureDetails
@@ -57,6 +71,6 @@ class CompleteRequirements(BaseModel):
     missing_info: MissingInfo
 
 
-class RequirementsResponseModel(BaseModel):
+class RequirementsResponseModel(_StructuredResponse):
     requirements: CompleteRequirements
 
@@ -1,4 +1,5 @@
-from app.agents.tools.colour_model import colour_predictor
+from app.agents.tools.colour_model import colour_predictor, colour_predictor_batch
 
 _all_ = [
-    "colour_predictor"]
\ No newline at end of file
+    "colour_predictor",
+    "colour_predictor_batch"]
\ No newline at end of file
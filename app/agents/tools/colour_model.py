@@ -1,6 +1,9 @@
+import functools
+import logging
 import os
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import joblib
 import numpy as np
@@ -10,66 +13,76 @@ from pydantic import BaseModel, Field
 
 from app.core.config import settings
 
-# Global variable to store the loaded model (lazy loading)
-_loaded_model: Optional[object] = None
-_model_path: Optional[Path] = None
+try:
+    import onnxruntime
+except ImportError:  # optional "onnx" extra; fall back to the joblib model
+    onnxruntime = None
 
+logger = logging.getLogger(__name__)
 
-def _get_model_path() -> Path:
-    """Get the path to the trained model file."""
-    # Get the absolute path to this file
-    # File location: app/agents/tools/colour_model.py
-    current_file = Path(__file__).resolve()
-    
-    # Start from the current file and go up to find the app directory
-    # We know the structure: app/agents/tools/colour_model.py
-    # So we need to go up 3 levels: tools -> agents -> app
-    search_dir = current_file.parent  # Start at app/agents/tools/
-    
-    # Go up the directory tree until we find a directory containing 'ml_models'
-    for _ in range(4):  # Max 4 levels up (tools -> agents -> app -> project_root)
-        # Check if this directory or a subdirectory contains ml_models
-        ml_models_dir = search_dir / "ml_models"
-        if ml_models_dir.exists() and ml_models_dir.is_dir():
-            return ml_models_dir / "colour_changing_predictor.pkl"
-        
-        # Also check if we're at project root and app/ml_models exists
-        app_ml_models = search_dir / "app" / "ml_models"
-        if app_ml_models.exists() and app_ml_models.is_dir():
-            return app_ml_models / "colour_changing_predictor.pkl"
-        
-        # Move up one level
-        if search_dir.parent == search_dir:  # Reached filesystem root
-            break
-        search_dir = search_dir.parent
-    
-    # Fallback: assume standard structure (go up 3 levels from current file)
-    app_dir = current_file.parent.parent.parent
-    model_path = app_dir / "ml_models" / "colour_changing_predictor.pkl"
-    return model_path
+# Resolved once at import: app/agents/tools/colour_model.py -> app/ml_models/
+_MODEL_PATH = Path(__file__).resolve().parents[2] / "ml_models" / "colour_changing_predictor.pkl"
+# Optional ONNX export of the same model (see app/ml_models/export_onnx.py)
+_ONNX_MODEL_PATH = _MODEL_PATH.with_suffix(".onnx")
+
+
+class _OnnxRegressor:
+    """Expose an onnxruntime session through the sklearn `predict` interface."""
 
+    def __init__(self, model_path: Path):
+        options = onnxruntime.SessionOptions()
+        # Single-row requests are latency-bound; extra threads only add overhead
+        options.intra_op_num_threads = 1
+        # Errors only; keeps per-call runtime warnings out of stderr
+        options.log_severity_level = 3
+        self._session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self._session.get_inputs()[0].name
+
+    def predict(self, model_input) -> np.ndarray:
+        # No copy when the input is already a float32 array
+        return self._session.run(None, {self._input_name: np.asarray(model_input, dtype=np.float32)})[0]
 
+
+@functools.lru_cache(maxsize=1)
 def _load_model():
-    """Load the trained model from the .pkl file (lazy loading)."""
-    global _loaded_model, _model_path
+    """
+    Load the trained model (cached after the first call).
     
-    if _loaded_model is None:
-        model_path = _get_model_path()
-        
-        if not model_path.exists():
-            raise FileNotFoundError(
-                f"Model file not found at {model_path}. "
-                "Please ensure the trained model file 'colour_changing_predictor.pkl' exists."
-            )
-        
+    Uses the ONNX export when it exists and onnxruntime is installed,
+    otherwise the joblib .pkl file.
+    """
+    if onnxruntime is not None and _ONNX_MODEL_PATH.exists():
         try:
-            _loaded_model = joblib.load(model_path)
-            _model_path = model_path
-            print(f"✓ Model loaded successfully from {model_path}")
+            model = _OnnxRegressor(_ONNX_MODEL_PATH)
         except Exception as e:
-            raise RuntimeError(f"Failed to load model from {model_path}: {str(e)}")
-    
-    return _loaded_model
+            logger.warning("Failed to load ONNX model from %s, using joblib model: %s", _ONNX_MODEL_PATH, e)
+        else:
+            logger.info("Model loaded successfully from %s", _ONNX_MODEL_PATH)
+            return model
+
+    if not _MODEL_PATH.exists():
+        raise FileNotFoundError(
+            f"Model file not found at {_MODEL_PATH}. "
+            "Please ensure the trained model file 'colour_changing_predictor.pkl' exists."
+        )
+
+    try:
+        model = joblib.load(_MODEL_PATH)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load model from {_MODEL_PATH}: {str(e)}")
+
+    logger.info("Model loaded successfully from %s", _MODEL_PATH)
+    return model
+
+
+# Warm the model at import so server workers don't pay the load on their first request
+if os.getenv("PRELOAD_MODEL") == "1":
+    try:
+        _load_model()
+    except (FileNotFoundError, RuntimeError) as e:
+        logger.warning("Model preload failed: %s", e)
 
 
 class ColourChangeInput(BaseModel):
@@ -84,49 +97,124 @@ class ColourChangeInput(BaseModel):
     soaping_temperature: float = Field(..., description="soaping temp 70–95C")
     dyeing_time: int = Field(..., description="dyeing time 30–90 min")
     soaping_time: int = Field(..., description="soaping time 10–30 min")
-    liquor_ratio: int = Field(..., description="liquor ratio 10–20")
+    liquor_ratio: int = Field(..., description="liquor ratio 8–15")
     ph_level: float = Field(..., description="pH 10–11.5")
     water_hardness: int = Field(..., description="water hardness 50–300 ppm")
 
 
-def _prepare_model_input(
-    red: float,
-    green: float,
-    blue: float,
-    salt: float,
-    soda_ash: float,
-    dyeing_temperature: float,
-    soaping_temperature: float,
-    dyeing_time: int,
-    soaping_time: int,
-    liquor_ratio: int,
-    ph_level: float,
-    water_hardness: int,
-) -> pd.DataFrame:
+class ColourChangeBatchInput(BaseModel):
+    """Input schema for batched colour predictor requests."""
+
+    items: List[ColourChangeInput] = Field(..., description="parameter sets to predict in one call")
+
+
+# Feature order the model was trained on
+_FEATURE_ORDER = (
+    "dye_red_owf",
+    "dye_green_owf",
+    "dye_blue_owf",
+    "salt_gL",
+    "sodaAsh_gL",
+    "temp_C",
+    "time_min",
+    "pH",
+    "liquor_ratio",
+    "water_hardness_ppm",
+    "soap_temp_C",
+    "soap_time_min",
+)
+_FEATURE_COLUMNS = pd.Index(_FEATURE_ORDER)
+
+# Range of each ColourChangeInput field covered by the model's training data
+# (cotton_dyeing_dataset_1000_samples.csv; water hardness rounded up to 300 ppm),
+# listed in _FEATURE_ORDER. Values outside it are rejected before reaching the model.
+_RANGES = {
+    "red": (0, 5),
+    "green": (0, 5),
+    "blue": (0, 5),
+    "salt": (40, 80),
+    "soda_ash": (10, 20),
+    "dyeing_temperature": (60, 80),
+    "dyeing_time": (30, 90),
+    "ph_level": (10, 11.5),
+    "liquor_ratio": (8, 15),
+    "water_hardness": (50, 300),
+    "soaping_temperature": (70, 95),
+    "soaping_time": (10, 30),
+}
+
+# ColourChangeInput field names, aligned with _FEATURE_ORDER
+_PARAM_ORDER = tuple(_RANGES)
+
+# Model input dtype: sklearn trees score in float32 internally and the ONNX graph
+# takes float32, so wider inputs would only be cast down again
+_INPUT_DTYPE = np.float32
+
+# Single-row input buffer reused across predictions (guarded for concurrent agent runs)
+_INPUT_BUFFER = np.empty((1, len(_FEATURE_ORDER)), dtype=_INPUT_DTYPE)
+_INPUT_BUFFER_LOCK = threading.Lock()
+
+
+def _prepare_model_input(model, features: tuple):
     """
-    Map tool input parameters to model input format.
+    Write one feature row into the shared input buffer.
     
-    The model expects features in this exact order:
-    dye_red_owf, dye_green_owf, dye_blue_owf, salt_gL, sodaAsh_gL, 
-    temp_C, time_min, pH, liquor_ratio, water_hardness_ppm, 
-    soap_temp_C, soap_time_min
+    `features` must follow _FEATURE_ORDER. Models fitted on a DataFrame record
+    `feature_names_in_`, so they get a zero-copy DataFrame view over the buffer;
+    anything else receives the array directly.
+    Callers must hold _INPUT_BUFFER_LOCK until the model has consumed the input.
     """
-    model_input = pd.DataFrame({
-        "dye_red_owf": [red],
-        "dye_green_owf": [green],
-        "dye_blue_owf": [blue],
-        "salt_gL": [salt],
-        "sodaAsh_gL": [soda_ash],
-        "temp_C": [dyeing_temperature],
-        "time_min": [dyeing_time],
-        "pH": [ph_level],
-        "liquor_ratio": [liquor_ratio],
-        "water_hardness_ppm": [water_hardness],
-        "soap_temp_C": [soaping_temperature],
-        "soap_time_min": [soaping_time],
-    })
+    _INPUT_BUFFER[0, :] = features
+
+    if hasattr(model, "feature_names_in_"):
+        return pd.DataFrame(_INPUT_BUFFER, columns=_FEATURE_COLUMNS, copy=False)
+
+    return _INPUT_BUFFER
+
+
+@functools.lru_cache(maxsize=4096)
+def _predict_raw(features: tuple) -> tuple:
+    """
+    Predict a clamped (R, G, B) tuple for one feature row in _FEATURE_ORDER.
+    
+    The model is deterministic, so results are memoised per feature tuple;
+    repeated requests with the same parameters skip the forward pass.
+    """
+    # Load the model (cached - only loads once)
+    model = _load_model()
+    
+    # Fill the shared buffer and predict while holding the lock
+    with _INPUT_BUFFER_LOCK:
+        model_input = _prepare_model_input(model, features)
+        predicted_rgb = model.predict(model_input)
     
-    return model_input
+    # Model returns shape [1, 3]; clamp to the valid [0, 255] range
+    rgb_r, rgb_g, rgb_b = np.clip(predicted_rgb[0], 0, 255).astype(np.uint8).tolist()
+    
+    return rgb_r, rgb_g, rgb_b
+
+
+def _range_error(values: tuple) -> Optional[str]:
+    """Return an error message for the first value outside its valid range, if any."""
+    for (name, (low, high)), value in zip(_RANGES.items(), values):
+        if not low <= value <= high:
+            return f"{name}={value} out of range {low}-{high}"
+    return None
+
+
+def _prediction_error(error_msg: str) -> dict:
+    """Build the result returned when a prediction cannot be made."""
+    return {
+        "success": False,
+        "predicted_rgb": None,
+        "hex_color": None,
+        "error": error_msg,
+    }
+
+
+def prediction_cache_info() -> dict:
+    """Return hit/miss statistics for the single-prediction cache."""
+    return _predict_raw.cache_info()._asdict()
 
 
 def _make_prediction(
@@ -148,40 +236,32 @@ def _make_prediction(
     This is the core prediction logic shared by the tool and helper function.
     """
     try:
-        # Load the model (lazy loading - only loads once)
-        model = _load_model()
-        
-        # Prepare input data in the format expected by the model
-        model_input = _prepare_model_input(
-            red=red,
-            green=green,
-            blue=blue,
-            salt=salt,
-            soda_ash=soda_ash,
-            dyeing_temperature=dyeing_temperature,
-            soaping_temperature=soaping_temperature,
-            dyeing_time=dyeing_time,
-            soaping_time=soaping_time,
-            liquor_ratio=liquor_ratio,
-            ph_level=ph_level,
-            water_hardness=water_hardness,
+        values = (
+            red,
+            green,
+            blue,
+            salt,
+            soda_ash,
+            dyeing_temperature,
+            dyeing_time,
+            ph_level,
+            liquor_ratio,
+            water_hardness,
+            soaping_temperature,
+            soaping_time,
         )
+
+        # Out-of-range inputs can never give a valid prediction; skip the model entirely
+        error_msg = _range_error(values)
+        if error_msg is not None:
+            return _prediction_error(error_msg)
+
+        # Round to the inputs' natural precision so near-identical requests share a cache entry
+        features = tuple(round(value, 3) for value in values)
+        rgb_r, rgb_g, rgb_b = _predict_raw(features)
         
-        # Make prediction
-        predicted_rgb = model.predict(model_input)
-        
-        # Extract RGB values (model returns array with shape [1, 3])
-        rgb_r = int(predicted_rgb[0, 0])
-        rgb_g = int(predicted_rgb[0, 1])
-        rgb_b = int(predicted_rgb[0, 2])
-        
-        # Ensure RGB values are within valid range [0, 255]
-        rgb_r = max(0, min(255, rgb_r))
-        rgb_g = max(0, min(255, rgb_g))
-        rgb_b = max(0, min(255, rgb_b))
-        
-        # Generate hex color code
-        hex_color = f"#{rgb_r:02x}{rgb_g:02x}{rgb_b:02x}"
+        # Generate hex color code from the packed 24-bit value
+        hex_color = f"#{(rgb_r << 16) | (rgb_g << 8) | rgb_b:06x}"
         
         return {
             "success": True,
@@ -208,22 +288,69 @@ def _make_prediction(
         }
 
     except FileNotFoundError as e:
-        error_msg = str(e)
-        return {
-            "success": False,
-            "predicted_rgb": None,
-            "hex_color": None,
-            "error": error_msg,
-        }
+        return _prediction_error(str(e))
 
+    except Exception as e:
+        return _prediction_error(f"Prediction failed: {str(e)}")
+
+
+def _make_batch_prediction(items: List[ColourChangeInput]) -> List[dict]:
+    """
+    Predict RGB values for several parameter sets with a single model call.
+    
+    Returns one result per item, in order, with the same format as _make_prediction.
+    Items with out-of-range values get an error result and are left out of the model call.
+    """
+    rows = [tuple(getattr(item, name) for name in _PARAM_ORDER) for item in items]
+
+    # None marks a row that still needs a prediction
+    results = []
+    valid_items = []
+    valid_rows = []
+    for item, row in zip(items, rows):
+        error_msg = _range_error(row)
+        if error_msg is None:
+            results.append(None)
+            valid_items.append(item)
+            valid_rows.append(row)
+        else:
+            results.append(_prediction_error(error_msg))
+
+    if not valid_rows:
+        return results
+
+    try:
+        model = _load_model()
+
+        # Stack one row per item in the documented feature order
+        model_input = np.array(valid_rows, dtype=_INPUT_DTYPE)
+        if hasattr(model, "feature_names_in_"):
+            model_input = pd.DataFrame(model_input, columns=_FEATURE_COLUMNS, copy=False)
+
+        predicted_rgb = np.clip(model.predict(model_input), 0, 255).astype(np.uint8)
+
+        # Pack each row into one 24-bit value so every hex code is a single format call
+        rgb = predicted_rgb.astype(np.uint32)
+        packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+        hex_colors = [f"#{value:06x}" for value in packed.tolist()]
+
+        predictions = iter([
+            {
+                "success": True,
+                "predicted_rgb": {"R": rgb_r, "G": rgb_g, "B": rgb_b},
+                "hex_color": hex_color,
+                "input_parameters": item.model_dump(),
+            }
+            for item, (rgb_r, rgb_g, rgb_b), hex_color in zip(valid_items, predicted_rgb.tolist(), hex_colors)
+        ])
+        return [result or next(predictions) for result in results]
+
+    except FileNotFoundError as e:
+        error_msg = str(e)
     except Exception as e:
         error_msg = f"Prediction failed: {str(e)}"
-        return {
-            "success": False,
-            "predicted_rgb": None,
-            "hex_color": None,
-            "error": error_msg,
-        }
+
+    return [result or _prediction_error(error_msg) for result in results]
 
 
 @tool("colour_predictor", args_schema=ColourChangeInput)
@@ -254,7 +381,7 @@ def colour_predictor(
             - hex_color: hex color code (e.g., "#74cde7")
             - error: str error message if prediction failed
     """
-    print("--- TOOL CALLED: Predicting colour using local ML model ---")
+    logger.debug("colour_predictor called")
     
     result = _make_prediction(
         red=red,
@@ -273,13 +400,35 @@ def colour_predictor(
     
     if result.get("success"):
         rgb = result["predicted_rgb"]
-        print(f"✓ Prediction successful: RGB({rgb['R']}, {rgb['G']}, {rgb['B']}) = {result['hex_color']}")
+        logger.debug("Prediction successful: RGB(%d, %d, %d) = %s", rgb["R"], rgb["G"], rgb["B"], result["hex_color"])
     else:
-        print(f"✗ Error: {result.get('error', 'Unknown error')}")
+        logger.warning("Prediction failed: %s", result.get("error", "Unknown error"))
     
     return result
 
 
+@tool("colour_predictor_batch", args_schema=ColourChangeBatchInput)
+def colour_predictor_batch(items: List[ColourChangeInput]) -> List[dict]:
+    """
+    Predicts RGB color values for several sets of dyeing parameters in one call.
+    
+    Prefer this over repeated colour_predictor calls when comparing multiple
+    candidate recipes; all items are scored with a single model prediction.
+    
+    Returns:
+        list: One result per item, in order, each with the same format as
+            colour_predictor (success, predicted_rgb, hex_color, error)
+    """
+    logger.debug("colour_predictor_batch called with %d items", len(items))
+
+    results = _make_batch_prediction([ColourChangeInput.model_validate(item) for item in items])
+
+    succeeded = sum(1 for result in results if result.get("success"))
+    logger.debug("Batch prediction finished: %d/%d successful", succeeded, len(results))
+
+    return results
+
+
 def predict_from_requirements(requirements: dict) -> dict:
     """
     Predict RGB color values from gathered requirements dictionary.
@@ -334,16 +483,6 @@ def predict_from_requirements(requirements: dict) -> dict:
         )
         
     except KeyError as e:
-        return {
-            "success": False,
-            "predicted_rgb": None,
-            "hex_color": None,
-            "error": f"Missing required field in requirements: {str(e)}",
-        }
+        return _prediction_error(f"Missing required field in requirements: {str(e)}")
     except Exception as e:
-        return {
-            "success": False,
-            "predicted_rgb": None,
-            "hex_color": None,
-            "error": f"Failed to extract requirements: {str(e)}",
-        }
+        return _prediction_error(f"Failed to extract requirements: {str(e)}")
@@ -4,9 +4,89 @@ This script tests:
 1. Direct function call
 2. LangChain tool invocation
 3. Tool schema validation
+4. Batched predictions
+5. Out-of-range input rejection
 """
-import json
-from app.agents.tools.colour_model import colour_predictor
+import os
+import orjson
+from functools import lru_cache
+from app.agents.tools.colour_model import _make_prediction, _predict_raw, colour_predictor, colour_predictor_batch
+
+
+VERBOSE = bool(os.getenv("VERBOSE_TESTS"))
+
+
+def _print_json(label, value):
+    """Print value as pretty JSON under label, only when VERBOSE_TESTS is set"""
+    if VERBOSE:
+        print(f"{label}: {orjson.dumps(value, option=orjson.OPT_INDENT_2).decode()}")
+
+
+@lru_cache(maxsize=1)
+def _schema():
+    """JSON schema of the colour_predictor tool input (static, so generated once)"""
+    return colour_predictor.args_schema.model_json_schema()
+
+
+STANDARD_PARAMS = {
+    "red": 2.5,
+    "green": 1.0,
+    "blue": 0.5,
+    "salt": 50.0,
+    "soda_ash": 15.0,
+    "dyeing_temperature": 60.8,
+    "soaping_temperature": 80,
+    "dyeing_time": 45,
+    "soaping_time": 15,
+    "liquor_ratio": 10,
+    "ph_level": 10.5,
+    "water_hardness": 150
+}
+
+MULTIPLE_CASES = [
+    {
+        "name": "Case 1: Standard recipe",
+        "params": {
+            "red": 4.2,
+            "green": 3.5,
+            "blue": 2.8,
+            "salt": 60.0,
+            "soda_ash": 15.0,
+            "dyeing_temperature": 70.0,
+            "soaping_temperature": 85,
+            "dyeing_time": 60,
+            "soaping_time": 20,
+            "liquor_ratio": 15,
+            "ph_level": 10.5,
+            "water_hardness": 200
+        }
+    },
+    {
+        "name": "Case 2: High dye concentration",
+        "params": {
+            "red": 5.0,
+            "green": 4.0,
+            "blue": 3.0,
+            "salt": 80.0,
+            "soda_ash": 20.0,
+            "dyeing_temperature": 80.0,
+            "soaping_temperature": 95,
+            "dyeing_time": 90,
+            "soaping_time": 30,
+            "liquor_ratio": 15,
+            "ph_level": 11.0,
+            "water_hardness": 300
+        }
+    }
+]
+
+
+@lru_cache(maxsize=1)
+def _predictions():
+    """Run every single-recipe tool test input through one colour_predictor.batch call"""
+    params_list = [STANDARD_PARAMS] + [case["params"] for case in MULTIPLE_CASES]
+    return tuple(colour_predictor.batch(params_list, config={"max_concurrency": len(params_list)}))
+
 
 def test_direct_function_call():
     """Test calling the function directly (bypassing LangChain tool wrapper)"""
@@ -14,22 +94,16 @@ def test_direct_function_call():
     print("TEST 1: Direct Function Call")
     print("=" * 60)
     
-    result = colour_predictor.invoke({
-        "dye_red_owf": 2.5,
-        "dye_green_owf": 1.0,
-        "dye_blue_owf": 0.5,
-        "salt_gL": 50.0,
-        "sodaAsh_gL": 15.0,
-        "temp_C": 60.8,
-        "time_min": 45,
-        "pH": 10.5,
-        "liquor_ratio": 10,
-        "water_hardness_ppm": 150,
-        "soap_temp_C": 80,
-        "soap_time_min": 15
-    })
-    
-    print(f"Result: {json.dumps(result, indent=2)}")
+    tool_result = _predictions()[0]
+    # Clear the prediction cache so the direct call runs the model instead of reusing the tool's result
+    _predict_raw.cache_clear()
+    result = _make_prediction(**STANDARD_PARAMS)
+    
+    assert result["success"], result["error"]
+    # The tool wrapper must return the same prediction as the function it wraps
+    assert result["predicted_rgb"] == tool_result["predicted_rgb"]
+    assert result["hex_color"] == tool_result["hex_color"]
+    _print_json("Result", result)
     print(f"✓ Direct function call successful!")
     print()
 
@@ -42,8 +116,7 @@ def test_tool_schema():
     
     print(f"Tool name: {colour_predictor.name}")
     print(f"Tool description: {colour_predictor.description}")
-    print(f"\nTool schema:")
-    print(json.dumps(colour_predictor.args_schema.model_json_schema(), indent=2))
+    _print_json("\nTool schema", _schema())
     print(f"✓ Tool schema validated!")
     print()
 
@@ -73,48 +146,12 @@ def test_multiple_predictions():
     print("TEST 4: Multiple Predictions")
     print("=" * 60)
     
-    test_cases = [
-        {
-            "name": "Case 1: Standard recipe",
-            "params": {
-                "dye_red_owf": 4.2,
-                "dye_green_owf": 3.5,
-                "dye_blue_owf": 2.8,
-                "salt_gL": 60.0,
-                "sodaAsh_gL": 15.0,
-                "temp_C": 70.0,
-                "time_min": 60,
-                "pH": 10.5,
-                "liquor_ratio": 15,
-                "water_hardness_ppm": 200,
-                "soap_temp_C": 85,
-                "soap_time_min": 20
-            }
-        },
-        {
-            "name": "Case 2: High dye concentration",
-            "params": {
-                "dye_red_owf": 5.0,
-                "dye_green_owf": 4.0,
-                "dye_blue_owf": 3.0,
-                "salt_gL": 80.0,
-                "sodaAsh_gL": 20.0,
-                "temp_C": 80.0,
-                "time_min": 90,
-                "pH": 11.0,
-                "liquor_ratio": 20,
-                "water_hardness_ppm": 300,
-                "soap_temp_C": 95,
-                "soap_time_min": 30
-            }
-        }
-    ]
-    
-    for test_case in test_cases:
+    for test_case, result in zip(MULTIPLE_CASES, _predictions()[1:]):
         print(f"\n{test_case['name']}:")
-        result = colour_predictor.invoke(test_case['params'])
-        print(f"  RGB: ({result['R']:.1f}, {result['G']:.1f}, {result['B']:.1f})")
-        print(f"  HEX: {result['hex']}")
+        assert result["success"], result["error"]
+        rgb = result["predicted_rgb"]
+        print(f"  RGB: ({rgb['R']}, {rgb['G']}, {rgb['B']})")
+        print(f"  HEX: {result['hex_color']}")
         print(f"  Success: {result['success']}")
     
     print(f"\n✓ Multiple predictions successful!")
@@ -128,32 +165,77 @@ def test_tool_in_agent_context():
     print("=" * 60)
     
     # Simulate how LangChain agent would call the tool
-    tool_input = {
-        "dye_red_owf": 2.5,
-        "dye_green_owf": 1.0,
-        "dye_blue_owf": 0.5,
-        "salt_gL": 50.0,
-        "sodaAsh_gL": 15.0,
-        "temp_C": 60.8,
-        "time_min": 45,
-        "pH": 10.5,
-        "liquor_ratio": 10,
-        "water_hardness_ppm": 150,
-        "soap_temp_C": 80,
-        "soap_time_min": 15
-    }
+    tool_input = STANDARD_PARAMS
     
     print("Simulating agent tool call...")
-    print(f"Tool input: {json.dumps(tool_input, indent=2)}")
+    _print_json("Tool input", tool_input)
     
-    result = colour_predictor.invoke(tool_input)
+    result = _predictions()[0]
     
-    print(f"Tool output: {json.dumps(result, indent=2)}")
+    assert result["success"], result["error"]
+    _print_json("Tool output", result)
     print(f"✓ Tool works correctly in agent context!")
     print()
 
 
+def test_batch_predictions():
+    """Test predicting several recipes in a single batch call"""
+    print("=" * 60)
+    print("TEST 6: Batch Predictions")
+    print("=" * 60)
+    
+    base_params = STANDARD_PARAMS
+    items = [base_params, {**base_params, "red": 4.2, "green": 3.5, "blue": 2.8}]
+    
+    results = colour_predictor_batch.invoke({"items": items})
+    single = _predictions()[0]
+    
+    assert len(results) == len(items)
+    assert all(result["success"] for result in results)
+    assert results[0]["predicted_rgb"] == single["predicted_rgb"]
+    assert results[0]["hex_color"] == single["hex_color"]
+    for result in results:
+        rgb = result["predicted_rgb"]
+        print(f"  RGB: ({rgb['R']}, {rgb['G']}, {rgb['B']}) HEX: {result['hex_color']}")
+    
+    print(f"✓ Batch predictions match single predictions!")
+    print()
+
+
+def test_out_of_range_inputs():
+    """Test that values outside the model's training range are rejected before prediction"""
+    print("=" * 60)
+    print("TEST 7: Out-of-Range Inputs")
+    print("=" * 60)
+    
+    result = colour_predictor.invoke({**STANDARD_PARAMS, "liquor_ratio": 20})
+    assert not result["success"]
+    assert result["predicted_rgb"] is None
+    assert result["error"] == "liquor_ratio=20 out of range 8-15"
+    print(f"  Rejected: {result['error']}")
+    
+    # The lowest liquor ratio in the training data is still accepted
+    result = colour_predictor.invoke({**STANDARD_PARAMS, "liquor_ratio": 8})
+    assert result["success"], result["error"]
+    
+    # In a batch only the out-of-range item fails; the others are still predicted
+    results = colour_predictor_batch.invoke({"items": [STANDARD_PARAMS, {**STANDARD_PARAMS, "salt": 100.0}]})
+    assert results[0]["success"]
+    assert results[0]["hex_color"] == _predictions()[0]["hex_color"]
+    assert results[1]["error"] == "salt=100.0 out of range 40-80"
+    
+    print(f"✓ Out-of-range inputs rejected!")
+    print()
+
+
+def _warmup():
+    """Load the model once before the suite so no single test absorbs the cold start"""
+    colour_predictor.invoke(STANDARD_PARAMS)
+
+
 if __name__ == "__main__":
+    _warmup()
+    
     print("\n" + "=" * 60)
     print("COLOUR PREDICTOR TOOL TEST SUITE")
     print("=" * 60 + "\n")
@@ -164,6 +246,8 @@ if __name__ == "__main__":
         test_tool_with_invalid_input()
         test_multiple_predictions()
         test_tool_in_agent_context()
+        test_batch_predictions()
+        test_out_of_range_inputs()
         
         print("=" * 60)
         print("ALL TESTS COMPLETED SUCCESSFULLY! ✓")
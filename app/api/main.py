@@ -1,69 +1,132 @@
 """
 FastAPI application for Colour Predictor UI.
 """
-import uuid
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Optional, TypedDict
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-
-from app.agents.requirements_graph import requirements_graph, RequirementsGraphState
+from uuid_utils import uuid7
+
+from app.agents.requirements_graph import (
+    checkpointer,
+    close_checkpointer,
+    open_checkpointer,
+    requirements_graph,
+    RequirementsGraphState,
+)
+from app.agents.tools.colour_model import prediction_cache_info
+from app.core.config import settings
+from app.core.llm import aclose_http_clients
+from app.core.sessions import SessionStore
 from langchain.messages import HumanMessage, AIMessage
 from langgraph.types import Command
 
+# Debug output (tool calls, per-prediction results) stays off unless LOG_LEVEL=DEBUG
+logging.basicConfig(level=settings.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# One session store (and Redis connection pool) per process, shared by all requests.
+# Sessions dropped from memory take their graph checkpoints with them, and the store
+# keeps no more sessions than the checkpointer keeps threads.
+session_store = SessionStore(
+    settings.REDIS_URL or None,
+    on_expire=checkpointer.delete_thread,
+    max_local_sessions=settings.CHECKPOINT_MAX_THREADS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_checkpointer()
+    yield
+    # Release pooled LLM and Redis connections on shutdown
+    await aclose_http_clients()
+    await session_store.aclose()
+    await close_checkpointer()
 
-app = FastAPI(title="Colour Predictor API", version="1.0.0")
 
-# CORS middleware
+# orjson encodes responses (chat results carry nested prediction/requirements dicts) much faster
+app = FastAPI(
+    title="Colour Predictor API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# CORS middleware. The bundled UI is same-origin; set ALLOWED_ORIGINS for other frontends.
+# No cookies are used, so credentials stay off and a wildcard answers with a plain "*".
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify allowed origins
-    allow_credentials=True,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# In-memory session storage (use Redis or database in production)
-sessions: Dict[str, dict] = {}
-
-
 class ChatMessage(BaseModel):
     message: str
     session_id: Optional[str] = None
 
 
-class ChatResponse(BaseModel):
+# Built by the server itself, so it is returned as a plain dict without Pydantic validation
+class ChatResponse(TypedDict):
     session_id: str
     response: str
     requires_input: bool
-    prediction_result: Optional[dict] = None
-    requirements: Optional[dict] = None
+    prediction_result: Optional[dict]
+    requirements: Optional[dict]
 
 
-def process_graph_step(session_id: str, user_message: str) -> dict:
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, (dict, list)) and not value)
+
+
+def _strip_empty(value):
+    """Recursively drop None values and empty dicts/lists from nested dicts and lists."""
+    if isinstance(value, dict):
+        stripped = ((key, _strip_empty(item)) for key, item in value.items())
+        return {key: item for key, item in stripped if not _is_empty(item)}
+    if isinstance(value, list):
+        return [item for item in map(_strip_empty, value) if not _is_empty(item)]
+    return value
+
+
+async def process_graph_step(session_id: str, user_message: str) -> dict:
     """
     Process a step in the LangGraph workflow.
     """
     config = {"configurable": {"thread_id": session_id}}
-    session_exists = session_id in sessions
     
-    if not session_exists:
+    snapshot = None
+    if await session_store.exists(session_id):
+        # The checkpoint can be gone (evicted or expired) while the session marker is still
+        # live; resuming then would drop the reply, so the message starts a new flow instead
+        snapshot = await requirements_graph.aget_state(config)
+        if not snapshot.interrupts:
+            await session_store.discard(session_id)
+            snapshot = None
+    
+    if snapshot is None:
         # Initialize new session
         initial_state = RequirementsGraphState(
             messages=[
                 HumanMessage(content=user_message or "")
             ]
         )
-        result = requirements_graph.invoke(initial_state, config)
-        sessions[session_id] = True  # Mark session as existing
+        result = await requirements_graph.ainvoke(initial_state, config)
+    elif not (user_message or "").strip():
+        # An empty reply would only re-run the waiting node to ask again; repeat the pending question
+        result = {**snapshot.values, "__interrupt__": list(snapshot.interrupts)}
     else:
         # Continue existing session - resume from interruption
         current_state = Command(resume=user_message)
-        result = requirements_graph.invoke(current_state, config)
+        result = await requirements_graph.ainvoke(current_state, config)
     
     # Check if we need user input (interruption)
     if "__interrupt__" in result:
@@ -76,6 +139,9 @@ def process_graph_step(session_id: str, user_message: str) -> dict:
         else:
             interrupt_message = "Please provide more information."
         
+        # Mark the session as waiting for input (refreshes its expiry)
+        await session_store.add(session_id)
+        
         return {
             "requires_input": True,
             "response": interrupt_message,
@@ -83,7 +149,11 @@ def process_graph_step(session_id: str, user_message: str) -> dict:
             "requirements": result.get("requirements"),
         }
     
-    # Graph completed - extract state from result
+    # Graph completed - free its checkpoints; the next message starts a new flow
+    await checkpointer.adelete_thread(session_id)
+    await session_store.discard(session_id)
+    
+    # Extract state from result
     response_text = ""
     
     # Check for prediction result
@@ -106,83 +176,74 @@ def process_graph_step(session_id: str, user_message: str) -> dict:
     }
 
 
-@app.post("/api/chat", response_model=ChatResponse)
+@app.post("/api/chat")
 async def chat(message: ChatMessage):
     """
     Send a message and get a response from the colour predictor agent.
     """
-    # Generate or use session ID
-    session_id = message.session_id or str(uuid.uuid4())
+    # Generate or use session ID (time-ordered UUIDv7; no os.urandom syscall per id)
+    session_id = message.session_id or str(uuid7())
     
     try:
-        result = process_graph_step(session_id, message.message)
+        result = await process_graph_step(session_id, message.message)
         
-        return ChatResponse(
+        return ORJSONResponse(ChatResponse(
             session_id=session_id,
             response=result["response"],
             requires_input=result["requires_input"],
-            prediction_result=result["prediction_result"],
-            requirements=result["requirements"],
-        )
+            # Leave out unset fields (e.g. the null RGB of a failed prediction) to keep payloads small
+            prediction_result=_strip_empty(result["prediction_result"]),
+            requirements=_strip_empty(result["requirements"]),
+        ))
     except Exception as e:
-        import traceback
-        error_msg = str(e)
-        error_traceback = traceback.format_exc()
-        error_detail = f"Error processing message: {error_msg}\n{error_traceback}"
-        print("=" * 80)
-        print("ERROR DETAILS:")
-        print(error_detail)
-        print("=" * 80)
-        raise HTTPException(status_code=500, detail=f"Error: {error_msg}")
+        # The traceback is only formatted if a handler is enabled for ERROR
+        logger.exception("Error processing message for session %s", session_id)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+_HEALTH_OK = {"status": "ok"}
 
 
 @app.get("/api/health")
 async def health():
     """Health check endpoint."""
-    return {"status": "ok"}
+    return _HEALTH_OK
+
+
+@app.get("/api/debug/prediction-cache")
+async def prediction_cache():
+    """Report hit/miss statistics for the colour prediction cache (for tuning its size)."""
+    return prediction_cache_info()
+
+
+# Built once: the state never changes, so the endpoint only reports it.
+# The state is a TypedDict, so its defaults are spelled out here.
+_TEST_MSG = HumanMessage(content="test")
+_TEST_STATE = RequirementsGraphState(
+    messages=[_TEST_MSG],
+    requirements_complete=False,
+    interruption_message="",
+)
 
 
 @app.get("/api/test-graph")
 async def test_graph():
     """Test endpoint to check if graph initialization works."""
-    try:
-        from app.agents.requirements_graph import RequirementsGraphState, requirements_graph
-        from langchain.messages import HumanMessage
-        
-        test_state = RequirementsGraphState(messages=[HumanMessage(content="test")])
-        config = {"configurable": {"thread_id": "test-thread"}}
-        
-        # Just check if we can create the state
-        return {
-            "status": "ok",
-            "state_created": True,
-            "requirements_complete": test_state.requirements_complete,
-            "interruption_message": test_state.interruption_message
-        }
-    except Exception as e:
-        import traceback
-        return {
-            "status": "error",
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        }
+    return {
+        "status": "ok",
+        "state_created": True,
+        "requirements_complete": _TEST_STATE["requirements_complete"],
+        "interruption_message": _TEST_STATE["interruption_message"]
+    }
 
 
-# Get the project root directory (where static/ folder is)
-PROJECT_ROOT = Path(__file__).parent.parent.parent
+# Get the project root directory (where static/ folder is), resolved once at import:
+# app/api/main.py -> project root
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
 STATIC_DIR = PROJECT_ROOT / "static"
 
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve the main HTML page."""
-    html_path = STATIC_DIR / "index.html"
-    return FileResponse(str(html_path))
-
-
-# Mount static files
-try:
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
-except RuntimeError:
-    # Directory doesn't exist yet, will be created
-    pass
+# Serve the UI (index.html at "/") and its files; mounted last so the API routes above win.
+# StaticFiles normalises its directory on every lookup; an already-resolved path keeps that cheap.
+STATIC_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/", StaticFiles(directory=str(STATIC_DIR), html=True), name="static")
@@ -1,5 +1,6 @@
 # app/config.py
 import os
+from typing import List
 
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -13,13 +14,24 @@ class Settings(BaseModel):
 
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL_NAME: str = "gpt-4.1"
+    REQUIREMENTS_MODEL_NAME: str = "gpt-4.1"
     CONVEX_BASE_URL: str = ""
+    CHECKPOINT_MAX_THREADS: int = 1024
+    REDIS_URL: str = ""
+    LOG_LEVEL: str = "INFO"
+    ALLOWED_ORIGINS: List[str] = ["*"]
 
 
 settings = Settings(
     OPENAI_API_KEY=os.getenv("OPENAI_API_KEY") or "",
     OPENAI_MODEL_NAME=os.getenv("OPENAI_MODEL_NAME", "gpt-4.1"),
+    REQUIREMENTS_MODEL_NAME=os.getenv("REQUIREMENTS_MODEL_NAME") or os.getenv("OPENAI_MODEL_NAME", "gpt-4.1"),
     CONVEX_BASE_URL=os.getenv("CONVEX_BASE_URL") or "",
+    CHECKPOINT_MAX_THREADS=int(os.getenv("CHECKPOINT_MAX_THREADS", "1024")),
+    REDIS_URL=os.getenv("REDIS_URL") or "",
+    LOG_LEVEL=(os.getenv("LOG_LEVEL") or "INFO").upper(),
+    # Comma-separated, e.g. "https://app.example.com,http://localhost:3000"
+    ALLOWED_ORIGINS=[origin.strip() for origin in (os.getenv("ALLOWED_ORIGINS") or "*").split(",") if origin.strip()],
 )
 
 # Fail fast if essential keys are missing
@@ -1,5 +1,79 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import httpx
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langchain_openai import ChatOpenAI
 
 from app.core.config import settings
 
-llm = ChatOpenAI(model=settings.OPENAI_MODEL_NAME, api_key=settings.OPENAI_API_KEY)
\ No newline at end of file
+# Shared HTTP/2 connection pools, so LLM calls reuse open connections instead of re-handshaking
+_HTTP_TIMEOUT = 60
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+
+http_client = httpx.Client(http2=True, timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS)
+http_async_client = httpx.AsyncClient(http2=True, timeout=_HTTP_TIMEOUT, limits=_HTTP_LIMITS)
+
+# OpenAI tool definitions keyed by (id(tool), strict); the tool is stored with its
+# definition so the object behind the id stays alive
+_TOOL_SCHEMA_CACHE: Dict[Tuple[int, Optional[bool]], Tuple[Any, dict]] = {}
+
+
+def _openai_tool(tool: Any, strict: Optional[bool]) -> Any:
+    """Return the OpenAI definition of a tool, generating its JSON schema only once."""
+    # Only tools and Pydantic models are reused unchanged across calls; tools with
+    # provider extras keep the default conversion so the extras are passed through
+    is_model = isinstance(tool, type)
+    if not (is_model or isinstance(tool, BaseTool)) or getattr(tool, "extras", None):
+        return tool
+
+    key = (id(tool), strict)
+    cached = _TOOL_SCHEMA_CACHE.get(key)
+    if cached is None:
+        cached = _TOOL_SCHEMA_CACHE[key] = (tool, convert_to_openai_tool(tool, strict=strict))
+    return cached[1]
+
+
+def precompile_tool_schemas(tools: Sequence[Any], strict: Optional[bool] = None) -> None:
+    """Generate and cache the OpenAI definitions of tools ahead of their first call."""
+    for tool in tools:
+        _openai_tool(tool, strict)
+
+
+class _CachedToolSchemaChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI that reuses each tool's OpenAI definition.
+    
+    The agent binds its tools before every model call, and converting a tool walks its
+    whole Pydantic schema. Already-converted definitions pass through bind_tools untouched.
+    """
+
+    def bind_tools(self, tools, *, strict=None, response_format=None, **kwargs):
+        # Same strict default ChatOpenAI.bind_tools applies, so cached definitions match it
+        effective_strict = strict
+        if response_format and strict is not False and not self.use_responses_api:
+            effective_strict = True
+
+        return super().bind_tools(
+            [_openai_tool(tool, effective_strict) for tool in tools],
+            strict=strict,
+            response_format=response_format,
+            **kwargs,
+        )
+
+
+# Model for the slot-filling turns of requirements gathering. Defaults to
+# OPENAI_MODEL_NAME; REQUIREMENTS_MODEL_NAME can point it at a smaller model once its
+# structured-output accuracy has been checked
+requirements_llm = _CachedToolSchemaChatOpenAI(
+    model=settings.REQUIREMENTS_MODEL_NAME,
+    api_key=settings.OPENAI_API_KEY,
+    http_client=http_client,
+    http_async_client=http_async_client,
+)
+
+
+async def aclose_http_clients() -> None:
+    """Close the shared HTTP clients; call once on process shutdown."""
+    http_client.close()
+    await http_async_client.aclose()
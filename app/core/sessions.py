@@ -0,0 +1,82 @@
+import time
+from typing import Callable, Optional
+
+from cachetools import TTLCache
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional "redis" extra; sessions stay in process memory
+    redis = None
+
+# Sessions left idle this long are forgotten
+SESSION_TTL_SECONDS = 3600
+
+_KEY_PREFIX = "sess:"
+
+
+class _LocalSessions(TTLCache):
+    """TTLCache that reports every session it drops because it expired or ran out of room."""
+
+    def __init__(self, maxsize: int, on_expire: Callable[[str], None], timer: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize=maxsize, ttl=SESSION_TTL_SECONDS, timer=timer)
+        self._on_expire = on_expire
+
+    def popitem(self):
+        session_id, value = super().popitem()
+        self._on_expire(session_id)
+        return session_id, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for session_id, _ in expired:
+            self._on_expire(session_id)
+        return expired
+
+
+class SessionStore:
+    """
+    Tracks which chat sessions have a graph run in progress.
+
+    Uses Redis when a URL is given, so every API worker sees the same sessions
+    and they survive restarts; otherwise keeps at most `max_local_sessions` in
+    this process, least recently used dropped first, each for at most the TTL.
+    `on_expire` is called with the id of each in-process session that is
+    dropped without being discarded.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        on_expire: Optional[Callable[[str], None]] = None,
+        max_local_sessions: int = 1024,
+    ):
+        if redis_url and redis is None:
+            raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed.")
+
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._local = _LocalSessions(max_local_sessions, on_expire or (lambda session_id: None))
+
+    async def exists(self, session_id: str) -> bool:
+        if self._redis is None:
+            # Membership checks don't evict, so drop expired sessions (and their checkpoints)
+            # now; otherwise the next add() would delete the checkpoint of the flow started after
+            self._local.expire()
+            return session_id in self._local
+        return bool(await self._redis.exists(_KEY_PREFIX + session_id))
+
+    async def add(self, session_id: str) -> None:
+        if self._redis is None:
+            self._local[session_id] = True
+        else:
+            await self._redis.set(_KEY_PREFIX + session_id, "1", ex=SESSION_TTL_SECONDS)
+
+    async def discard(self, session_id: str) -> None:
+        if self._redis is None:
+            self._local.pop(session_id, None)
+        else:
+            await self._redis.delete(_KEY_PREFIX + session_id)
+
+    async def aclose(self) -> None:
+        """Close the Redis connection pool; call once on process shutdown."""
+        if self._redis is not None:
+            await self._redis.aclose()
@@ -0,0 +1,36 @@
+"""
+Export the trained colour model to ONNX for serving with onnxruntime.
+
+Run from the project root after installing the "onnx" extra:
+
+    python app/ml_models/export_onnx.py
+
+The tool in app/agents/tools/colour_model.py picks up
+colour_changing_predictor.onnx automatically when onnxruntime is installed.
+"""
+from pathlib import Path
+
+import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+MODEL_DIR = Path(__file__).resolve().parent
+PKL_PATH = MODEL_DIR / "colour_changing_predictor.pkl"
+ONNX_PATH = MODEL_DIR / "colour_changing_predictor.onnx"
+
+
+def export_onnx_model() -> Path:
+    """Convert the joblib model to ONNX and write it next to the .pkl file."""
+    model = joblib.load(PKL_PATH)
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[("input", FloatTensorType([None, model.n_features_in_]))],
+        # Declare all three outputs (R, G, B); the default shape is [None, 1]
+        final_types=[("variable", FloatTensorType([None, model.n_outputs_]))],
+    )
+    ONNX_PATH.write_bytes(onnx_model.SerializeToString())
+    return ONNX_PATH
+
+
+if __name__ == "__main__":
+    print(f"✓ ONNX model written to {export_onnx_model()}")
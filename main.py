@@ -1,6 +1,8 @@
 """
 Main entry point for running the Colour Predictor application.
 """
+import sys
+
 import uvicorn
 
 if __name__ == "__main__":
@@ -9,4 +11,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
+        # libuv event loop and C HTTP parser; uvloop is unavailable on Windows
+        loop="auto" if sys.platform == "win32" else "uvloop",
+        http="httptools",
     )